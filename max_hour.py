@@ -1,6 +1,8 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
+import json
+from datetime import timedelta
 from io import BytesIO
 import plotly.express as px
 import plotly.graph_objects as go
@@ -44,232 +46,339 @@ st.markdown("""
 </div>
 """, unsafe_allow_html=True)
 
+# Possible column names per report
+MONTHLY_COLUMNS = {
+    'crew_id': ['Crew ID', 'ID', 'crew id', 'id'],
+    'flight_hours': ['Flight Hours', 'FLIGHT HOURS', 'flight hours'],
+    'rank': ['Rank', 'RANK', 'rank'],
+    'company': ['Company', 'COMPANY', 'company'],
+    'crew_category': ['Crew Category', 'CREW CATEGORY', 'crew category'],
+    'crew_status': ['Crew Status', 'CREW STATUS', 'crew status'],
+    'name': ['Name', 'name', 'Crew Name', 'crew name']
+}
+
+CONSECUTIVE_COLUMNS = {
+    'id': ['ID', 'Crew ID', 'id', 'crew id'],
+    'flight_hours': ['FLIGHT HOURS', 'Flight Hours', 'flight hours'],
+    'rank': ['RANK', 'Rank', 'rank'],
+    'company': ['COMPANY', 'Company', 'company'],
+    'name': ['Crew Name', 'crew name', 'Name', 'name']
+}
+
+# HH:MM flight hours (an optional :SS part is ignored)
+HHMM_PATTERN = r'^(\d+)\s*:\s*(\d+)(?::\d+)?$'
+
 # Helper functions
+def leftover_flight_hours(value):
+    """Convert a value that is neither a number nor HH:MM text"""
+    # Durations ([h]:mm cells) stored as objects
+    if isinstance(value, (timedelta, np.timedelta64)):
+        return round(pd.Timedelta(value).total_seconds() / 3600, 2)
+    # Empty cells stay empty, like in numeric columns
+    if isinstance(value, float):
+        return value
+    return 0.0
+
 def decimal_flight_hours(hours):
-    """Convert HH:MM format to decimal hours"""
-    try:
-        # Handle if already a number
-        if isinstance(hours, (int, float)):
-            return float(hours)
+    """Convert a Series of HH:MM values to decimal hours"""
+    # Numbers pass straight through
+    if pd.api.types.is_numeric_dtype(hours):
+        return hours.astype(float)
+    
+    # Durations ([h]:mm cells) are converted from their total seconds
+    if pd.api.types.is_timedelta64_dtype(hours):
+        return np.round(hours.dt.total_seconds() / 3600, 2)
+    
+    # Dates are not flight hours
+    if pd.api.types.is_datetime64_any_dtype(hours):
+        return pd.Series(0.0, index=hours.index)
+    
+    # Values that are already numbers pass straight through (text-only columns have none)
+    if pd.api.types.infer_dtype(hours, skipna=True) == 'string':
+        decimal = np.full(len(hours), np.nan)
+    else:
+        decimal = pd.to_numeric(hours, errors='coerce').to_numpy(dtype=float, copy=True)
+    
+    # Only the remaining values are parsed as text
+    missing = np.isnan(decimal)
+    if missing.any():
+        text = hours[missing].astype(str).str.strip()
+        
+        parsed = np.full(len(text), np.nan)
+        
+        # HH:MM format (optionally with :SS), matched with one compiled regex
+        is_hhmm = text.str.fullmatch(HHMM_PATTERN).to_numpy(dtype=bool)
+        if is_hhmm.any():
+            hhmm = text[is_hhmm]
+            jam = hhmm.str.replace(HHMM_PATTERN, r'\1', regex=True).astype(float)
+            menit = hhmm.str.replace(HHMM_PATTERN, r'\2', regex=True).astype(float)
+            parsed[is_hhmm] = np.round(jam + (menit / 60), 2)
         
-        # Convert to string and split by ':'
-        hours_str = str(hours).strip()
+        # If not HH:MM, treat as decimal
+        if not is_hhmm.all():
+            plain = text[~is_hhmm].str.replace(',', '')
+            parsed[~is_hhmm] = pd.to_numeric(plain, errors='coerce')
         
-        # If contains ':', it's in HH:MM format
-        if ':' in hours_str:
-            pemisah = hours_str.split(':')
-            jam = int(pemisah[0])
-            menit = int(pemisah[1])
-            jam_desimal = jam + (menit / 60)
-            return round(jam_desimal, 2)
-        else:
-            # If no ':', treat as decimal
-            return float(hours_str.replace(',', ''))
-    except:
-        return 0.0
-
-def find_column(df, possible_names):
-    """Find column name from possible variations (case-insensitive)"""
-    df_cols = {col: col for col in df.columns}
-    df_cols_lower = {col.lower(): col for col in df.columns}
-    
-    for name in possible_names:
-        # Exact match first
-        if name in df_cols:
-            return name
-        # Case-insensitive match
-        if name.lower() in df_cols_lower:
-            return df_cols_lower[name.lower()]
-    return None
+        decimal[missing] = parsed
+    
+    # Anything still unparsed (durations, invalid text) is handled per value
+    missing = np.isnan(decimal)
+    if missing.any():
+        decimal[missing] = hours[missing].map(leftover_flight_hours).to_numpy(dtype=float)
+    
+    return pd.Series(decimal, index=hours.index)
+
+def resolve_columns(columns, spec):
+    """Resolve column names from possible variations (case-insensitive) in one pass"""
+    df_cols = set(columns)
+    df_cols_lower = {col.lower(): col for col in columns}
+    
+    resolved = {}
+    for key, possible_names in spec.items():
+        resolved[key] = None
+        for name in possible_names:
+            # Exact match first
+            if name in df_cols:
+                resolved[key] = name
+                break
+            # Case-insensitive match
+            if name.lower() in df_cols_lower:
+                resolved[key] = df_cols_lower[name.lower()]
+                break
+    return resolved
+
+def display_columns(columns, crew_status_col):
+    """Select the columns shown for crew over limit from the resolved columns"""
+    display_cols = []
+    for col in [columns['name'], columns['company'], columns['rank']]:
+        if col and col not in display_cols:
+            display_cols.append(col)
+    
+    display_cols.append('Flight Hours Decimal')
+    
+    if crew_status_col:
+        display_cols.append(crew_status_col)
+    
+    return display_cols
 
 def actual_rank(rank):
-    """Determine actual rank (COCKPIT or CABIN)"""
-    rank_str = str(rank).strip().upper()
-    if rank_str in ["CPT", "FO", "CPT/FO"]:
-        return "COCKPIT"
-    else:
-        return "CABIN"
+    """Determine actual rank (COCKPIT or CABIN) for a Series of ranks"""
+    # Only the distinct rank values are normalized and classified
+    codes, uniques = pd.factorize(rank)
+    rank_str = pd.Index(uniques).astype(str).str.strip().str.upper()
+    
+    # Category code per distinct value (0 = COCKPIT, 1 = CABIN); missing ranks (-1) map to CABIN
+    unique_codes = np.where(rank_str.isin(["CPT", "FO", "CPT/FO"]), 0, 1)
+    return pd.Categorical.from_codes(
+        np.append(unique_codes, 1)[codes],
+        categories=["COCKPIT", "CABIN"]
+    )
 
-def crew_hour_status_mon(hours):
-    """Determine crew hour status for monthly (>110)"""
-    if hours > 110:
-        return "OVER"
-    else:
-        return "OTHER"
+def is_over_mon(hours):
+    """Flag crew over the monthly limit (>110)"""
+    return hours.to_numpy() > 110
 
-def crew_hour_status_year(hours):
-    """Determine crew hour status for yearly (>1050)"""
-    if hours > 1050:
-        return "OVER"
-    else:
-        return "OTHER"
-
-def process_monthly_data(df):
-    """Process Monthly Report Flight Hours data"""
-    # Find columns
-    crew_id_col = find_column(df, ['Crew ID', 'ID', 'crew id', 'id'])
-    fh_col = find_column(df, ['Flight Hours', 'FLIGHT HOURS', 'flight hours'])
-    rank_col = find_column(df, ['Rank', 'RANK', 'rank'])
-    company_col = find_column(df, ['Company', 'COMPANY', 'company'])
-    crew_cat_col = find_column(df, ['Crew Category', 'CREW CATEGORY', 'crew category'])
-    crew_status_col = find_column(df, ['Crew Status', 'CREW STATUS', 'crew status'])
+def is_over_year(hours):
+    """Flag crew over the yearly limit (>1050)"""
+    return hours.to_numpy() > 1050
+
+def crew_hour_status(is_over):
+    """Label crew hour status (OVER or OTHER) from the over-limit flags"""
+    return np.where(is_over, "OVER", "OTHER")
+
+def over_limit_view(df, over_idx, display_cols):
+    """View of crew over limit, keeping only the display columns"""
+    return df.iloc[over_idx, df.columns.get_indexer(display_cols)]
+
+def fill_missing(series, value='-'):
+    """Fill missing values, adding the fill value as a category if needed"""
+    if isinstance(series.dtype, pd.CategoricalDtype) and value not in series.cat.categories:
+        series = series.cat.add_categories([value])
+    return series.fillna(value)
+
+def categorize_columns(df, columns):
+    """Convert low-cardinality text columns to category dtype"""
+    for col in columns:
+        if col and col in df.columns:
+            df[col] = df[col].astype('category')
+    return df
+
+def wanted_columns(spec):
+    """Build a usecols filter keeping only columns named in the spec (case-insensitive)"""
+    names = {
+        name.lower()
+        for possible_names in spec.values()
+        for name in possible_names
+    }
+    return lambda col: str(col).lower() in names
+
+@st.cache_data(show_spinner=False)
+def load_monthly_data(file_bytes):
+    """Read Monthly Report Flight Hours (cached on file contents)"""
+    return pd.read_excel(
+        BytesIO(file_bytes),
+        sheet_name='Standardized_Company',
+        engine='calamine',
+        usecols=wanted_columns(MONTHLY_COLUMNS)
+    )
+
+@st.cache_data(show_spinner=False)
+def load_consecutive_data(file_bytes):
+    """Read Crew Consecutive Year Flight Hours (cached on file contents)"""
+    return pd.read_excel(
+        BytesIO(file_bytes),
+        header=1,
+        engine='calamine',
+        usecols=wanted_columns(CONSECUTIVE_COLUMNS)
+    )
+
+def process_monthly_data(df, columns):
+    """Process Monthly Report Flight Hours data (columns resolved from MONTHLY_COLUMNS)"""
+    fh_col = columns['flight_hours']
+    rank_col = columns['rank']
     
     if not fh_col:
         st.error("Column 'Flight Hours' not found in Monthly Report!")
         return None
     
     # Convert Flight Hours to decimal (HH:MM to decimal)
-    df['Flight Hours Decimal'] = df[fh_col].apply(decimal_flight_hours)
+    df['Flight Hours Decimal'] = decimal_flight_hours(df[fh_col])
     
     # Add Actual Rank column
     if rank_col:
-        df['Actual Rank'] = df[rank_col].apply(actual_rank)
+        df['Actual Rank'] = actual_rank(df[rank_col])
     else:
         df['Actual Rank'] = 'CABIN'
     
-    # Add Crew Hour Status column
-    df['Crew Hour Status'] = df['Flight Hours Decimal'].apply(crew_hour_status_mon)
+    # Add over-limit flag and Crew Hour Status column
+    df['is_over'] = is_over_mon(df['Flight Hours Decimal'])
+    df['Crew Hour Status'] = crew_hour_status(df['is_over'])
     
-    return df
+    # Store repeated labels as categoricals
+    return categorize_columns(df, ['Actual Rank', 'Crew Hour Status', columns['crew_status'], columns['company']])
 
-def process_consecutive_data(df, df_mon_standardized):
+def process_consecutive_data(df, columns, df_mon_standardized, monthly_columns):
     """Process Crew Consecutive Year Flight Hours data and merge with monthly"""
-    # Find columns in consecutive year data
-    id_col = find_column(df, ['ID', 'Crew ID', 'id', 'crew id'])
-    fh_col = find_column(df, ['FLIGHT HOURS', 'Flight Hours', 'flight hours'])
-    rank_col = find_column(df, ['RANK', 'Rank', 'rank'])
-    company_col = find_column(df, ['COMPANY', 'Company', 'company'])
+    id_col = columns['id']
+    fh_col = columns['flight_hours']
+    rank_col = columns['rank']
     
     if not fh_col:
         st.error("Column 'Flight Hours' not found in Consecutive Year Report!")
         return None
     
     # Convert Flight Hours to decimal (HH:MM to decimal)
-    df['Flight Hours Decimal'] = df[fh_col].apply(decimal_flight_hours)
+    df['Flight Hours Decimal'] = decimal_flight_hours(df[fh_col])
     
     # Add Actual Rank column
     if rank_col:
-        df['Actual Rank'] = df[rank_col].apply(actual_rank)
+        df['Actual Rank'] = actual_rank(df[rank_col])
     else:
         df['Actual Rank'] = 'CABIN'
     
-    # Add Crew Hour Status column
-    df['Crew Hour Status'] = df['Flight Hours Decimal'].apply(crew_hour_status_year)
+    # Add over-limit flag and Crew Hour Status column
+    df['is_over'] = is_over_year(df['Flight Hours Decimal'])
+    df['Crew Hour Status'] = crew_hour_status(df['is_over'])
     
     # Merge with monthly to get Crew Category and Crew Status
-    if df_mon_standardized is not None:
-        crew_id_monthly = find_column(df_mon_standardized, ['Crew ID', 'ID', 'crew id', 'id'])
-        crew_cat_monthly = find_column(df_mon_standardized, ['Crew Category', 'CREW CATEGORY', 'crew category'])
-        crew_status_monthly = find_column(df_mon_standardized, ['Crew Status', 'CREW STATUS', 'crew status'])
+    if df_mon_standardized is None:
+        monthly_columns = {}
+    crew_id_monthly = monthly_columns.get('crew_id')
+    crew_cat_monthly = monthly_columns.get('crew_category')
+    crew_status_monthly = monthly_columns.get('crew_status')
+    
+    if crew_id_monthly and crew_cat_monthly and crew_status_monthly and id_col:
+        # Only the lookup columns are needed, one row per Crew ID
+        lookup = (
+            df_mon_standardized[[crew_id_monthly, crew_cat_monthly, crew_status_monthly]]
+            .drop_duplicates(subset=[crew_id_monthly])
+            .set_index(crew_id_monthly)
+        )
         
-        if crew_id_monthly and crew_cat_monthly and crew_status_monthly and id_col:
-            # Merge using left join
-            df_merged = df.merge(
-                df_mon_standardized[[crew_id_monthly, crew_cat_monthly, crew_status_monthly]],
-                how='left',
-                left_on=id_col,
-                right_on=crew_id_monthly
-            )
-            
-            # Drop duplicate Crew ID column if exists
-            if crew_id_monthly in df_merged.columns and crew_id_monthly != id_col:
-                df_merged = df_merged.drop(columns=[crew_id_monthly])
-            
-            # Fill NaN with '-'
-            df_merged[crew_cat_monthly] = df_merged[crew_cat_monthly].fillna('-')
-            df_merged[crew_status_monthly] = df_merged[crew_status_monthly].fillna('-')
-            
-            # Rename to standard names
-            df_merged = df_merged.rename(columns={
-                crew_cat_monthly: 'Crew Category',
-                crew_status_monthly: 'Crew Status'
-            })
-            
-            return df_merged
-        else:
-            df['Crew Category'] = '-'
-            df['Crew Status'] = '-'
-            return df
+        # Left join against the indexed lookup
+        df = df.join(lookup, on=id_col, how='left')
+        
+        # Fill NaN with '-' under the standard names
+        df['Crew Category'] = fill_missing(df.pop(crew_cat_monthly))
+        df['Crew Status'] = fill_missing(df.pop(crew_status_monthly))
     else:
         df['Crew Category'] = '-'
         df['Crew Status'] = '-'
-        return df
+    
+    # Store repeated labels as categoricals
+    return categorize_columns(df, ['Actual Rank', 'Crew Hour Status', 'Crew Status', columns['company']])
 
-def calculate_summary(df, is_monthly=True):
+def calculate_summary(df, company_col, crew_status_col):
     """Calculate summary statistics per company"""
-    company_col = find_column(df, ['Company', 'COMPANY', 'company'])
-    id_col = find_column(df, ['Crew ID', 'ID', 'crew id', 'id'])
+    empty_summary = pd.DataFrame(columns=['Company', 'Total Ready Cockpit', 'Over Limit', 'Percentage'])
     
     if not company_col:
         st.warning("Column 'Company' not found!")
-        return pd.DataFrame()
-    
-    companies = df[company_col].unique()
-    summary_data = []
-    
-    for company in companies:
-        if pd.isna(company) or company == '':
-            continue
-            
-        company_df = df[df[company_col] == company]
-        
-        # Penyebut: Crew Status == Ready Crew & Actual Rank == COCKPIT
-        ready_cockpit = company_df[
-            (company_df['Crew Status'] == 'Ready Crew') & 
-            (company_df['Actual Rank'] == 'COCKPIT')
-        ]
-        
-        # Pembilang: Ready Crew & COCKPIT & OVER
-        ready_cockpit_over = ready_cockpit[ready_cockpit['Crew Hour Status'] == 'OVER']
-        
-        total = len(ready_cockpit)
-        over = len(ready_cockpit_over)
-        percentage = (over / total * 100) if total > 0 else 0
-        
-        summary_data.append({
-            'Company': company,
-            'Total Ready Cockpit': total,
-            'Over Limit': over,
-            'Percentage': round(percentage, 2)
-        })
-    
-    return pd.DataFrame(summary_data)
+        return empty_summary
+    
+    # Nothing can be counted without Crew Status
+    if not crew_status_col:
+        st.warning("Column 'Crew Status' not found!")
+        return empty_summary
+    
+    # Penyebut: Crew Status == Ready Crew & Actual Rank == COCKPIT
+    ready_cockpit = (df[crew_status_col] == 'Ready Crew') & (df['Actual Rank'] == 'COCKPIT')
+    
+    # Pembilang: Ready Crew & COCKPIT & OVER
+    ready_cockpit_over = ready_cockpit & df['is_over']
+    
+    # Count both per company in a single groupby pass
+    counts = pd.DataFrame({
+        'total': ready_cockpit,
+        'over': ready_cockpit_over
+    }).groupby(df[company_col], sort=False, observed=True).sum()
+    # Missing companies are skipped by groupby, blank ones are dropped here
+    counts = counts[counts.index != '']
+    
+    total = counts['total'].to_numpy()
+    over = counts['over'].to_numpy()
+    percentage = np.divide(over * 100, total, out=np.zeros(len(total)), where=total > 0)
+    
+    return pd.DataFrame({
+        'Company': counts.index,
+        'Total Ready Cockpit': total,
+        'Over Limit': over,
+        'Percentage': np.round(percentage, 2)
+    })
 
 def create_summary_report(monthly_summary, consecutive_summary):
     """Create final summary report matching the format"""
     if monthly_summary.empty and consecutive_summary.empty:
         return pd.DataFrame()
     
-    companies = sorted(list(set(
-        monthly_summary['Company'].tolist() + consecutive_summary['Company'].tolist()
-    )))
+    monthly_pct = pd.Series(
+        monthly_summary['Percentage'].to_numpy(),
+        index=pd.Index(monthly_summary['Company'], dtype=object)
+    )
+    consecutive_pct = pd.Series(
+        consecutive_summary['Percentage'].to_numpy(),
+        index=pd.Index(consecutive_summary['Company'], dtype=object)
+    )
+    companies = monthly_pct.index.union(consecutive_pct.index).sort_values()
+    
+    monthly_val = monthly_pct.reindex(companies, fill_value=0.0).map('{:.2f}%'.format)
+    consecutive_val = consecutive_pct.reindex(companies, fill_value=0.0).map('{:.2f}%'.format)
     
-    report_data = []
-    for company in companies:
-        monthly_pct = monthly_summary[monthly_summary['Company'] == company]['Percentage'].values
-        consecutive_pct = consecutive_summary[consecutive_summary['Company'] == company]['Percentage'].values
-        
-        monthly_val = f"{monthly_pct[0]:.2f}%" if len(monthly_pct) > 0 else "0.00%"
-        consecutive_val = f"{consecutive_pct[0]:.2f}%" if len(consecutive_pct) > 0 else "0.00%"
-        
-        report_data.append({
-            'Company': company,
-            'Period': 'Monthly',
-            'Percentage': monthly_val
-        })
-        report_data.append({
-            'Company': '',
-            'Period': '12 Consecutive Months',
-            'Percentage': consecutive_val
-        })
-    
-    return pd.DataFrame(report_data)
+    # Two rows per company: Monthly, then 12 Consecutive Months (company left blank)
+    report = pd.DataFrame({
+        'Company': np.repeat(companies.to_numpy(), 2),
+        'Period': np.tile(['Monthly', '12 Consecutive Months'], len(companies)),
+        'Percentage': np.column_stack([monthly_val, consecutive_val]).ravel()
+    })
+    report.loc[1::2, 'Company'] = ''
+    
+    return report
 
 def export_to_excel(summary_report, monthly_over, consecutive_over, monthly_summary, consecutive_summary):
     """Export results to Excel file"""
     output = BytesIO()
     
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
+    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
         # Summary sheet (formatted)
         summary_report.to_excel(writer, sheet_name='Summary Report', index=False)
         
@@ -286,6 +395,78 @@ def export_to_excel(summary_report, monthly_over, consecutive_over, monthly_summ
     output.seek(0)
     return output
 
+@st.cache_data(show_spinner=False)
+def build_bar_chart(summary, title):
+    """Build percentage bar chart by company (cached, returned as JSON)"""
+    fig = px.bar(
+        summary,
+        x='Company',
+        y='Percentage',
+        title=title,
+        labels={'Percentage': 'Percentage (%)'},
+        color='Percentage',
+        color_continuous_scale='Reds',
+        text='Percentage'
+    )
+    fig.update_traces(texttemplate='%{text:.2f}%', textposition='outside')
+    fig.update_layout(showlegend=False, yaxis_title="Percentage (%)")
+    return fig.to_json()
+
+@st.cache_data(show_spinner=False)
+def run_pipeline(monthly_bytes, consecutive_bytes):
+    """Run the full analysis for both uploads (cached on file contents)"""
+    # Read Excel files
+    df_mon_standardized = load_monthly_data(monthly_bytes)
+    df_year = load_consecutive_data(consecutive_bytes)
+    
+    st.info(f"📄 Monthly Report: {len(df_mon_standardized)} rows loaded")
+    st.info(f"📄 Consecutive Year: {len(df_year)} rows loaded")
+    
+    # Find columns once per report
+    monthly_columns = resolve_columns(df_mon_standardized.columns, MONTHLY_COLUMNS)
+    consecutive_columns = resolve_columns(df_year.columns, CONSECUTIVE_COLUMNS)
+    
+    # Process monthly data
+    df_mon_processed = process_monthly_data(df_mon_standardized, monthly_columns)
+    
+    if df_mon_processed is None:
+        return None
+    
+    # Process consecutive year data with merge
+    df_year_merged = process_consecutive_data(
+        df_year, consecutive_columns, df_mon_standardized, monthly_columns
+    )
+    
+    if df_year_merged is None:
+        return None
+    
+    # Calculate summaries
+    monthly_summary = calculate_summary(
+        df_mon_processed, monthly_columns['company'], monthly_columns['crew_status']
+    )
+    consecutive_summary = calculate_summary(
+        df_year_merged, consecutive_columns['company'], 'Crew Status'
+    )
+    
+    # Create final report
+    summary_report = create_summary_report(monthly_summary, consecutive_summary)
+    
+    # Get over limit crews (row positions only, views are built at display time)
+    monthly_over_idx = np.flatnonzero(df_mon_processed['is_over'].to_numpy())
+    consecutive_over_idx = np.flatnonzero(df_year_merged['is_over'].to_numpy())
+    
+    return {
+        'summary_report': summary_report,
+        'monthly_summary': monthly_summary,
+        'consecutive_summary': consecutive_summary,
+        'monthly_over_idx': monthly_over_idx,
+        'consecutive_over_idx': consecutive_over_idx,
+        'monthly_display_cols': display_columns(monthly_columns, monthly_columns['crew_status']),
+        'consecutive_display_cols': display_columns(consecutive_columns, 'Crew Status'),
+        'monthly_processed': df_mon_processed,
+        'consecutive_processed': df_year_merged
+    }
+
 # Main App
 st.markdown("---")
 
@@ -321,46 +502,14 @@ if st.button("🚀 Analyze Data", type="primary", use_container_width=True):
     else:
         with st.spinner("Processing data..."):
             try:
-                # Read Excel files
-                df_mon_standardized = pd.read_excel(monthly_file, sheet_name='Standardized_Company')
-                df_year = pd.read_excel(consecutive_file, header=1)
-                
-                st.info(f"📄 Monthly Report: {len(df_mon_standardized)} rows loaded")
-                st.info(f"📄 Consecutive Year: {len(df_year)} rows loaded")
-                
-                # Process monthly data
-                df_mon_processed = process_monthly_data(df_mon_standardized)
+                # Run the (cached) analysis pipeline
+                results = run_pipeline(monthly_file.getvalue(), consecutive_file.getvalue())
                 
-                if df_mon_processed is None:
+                if results is None:
                     st.stop()
                 
-                # Process consecutive year data with merge
-                df_year_merged = process_consecutive_data(df_year, df_mon_standardized)
-                
-                if df_year_merged is None:
-                    st.stop()
-                
-                # Calculate summaries
-                monthly_summary = calculate_summary(df_mon_processed, is_monthly=True)
-                consecutive_summary = calculate_summary(df_year_merged, is_monthly=False)
-                
-                # Create final report
-                summary_report = create_summary_report(monthly_summary, consecutive_summary)
-                
-                # Get over limit crews
-                monthly_over = df_mon_processed[df_mon_processed['Crew Hour Status'] == 'OVER']
-                consecutive_over = df_year_merged[df_year_merged['Crew Hour Status'] == 'OVER']
-                
                 # Store in session state
-                st.session_state['results'] = {
-                    'summary_report': summary_report,
-                    'monthly_summary': monthly_summary,
-                    'consecutive_summary': consecutive_summary,
-                    'monthly_over': monthly_over,
-                    'consecutive_over': consecutive_over,
-                    'monthly_processed': df_mon_processed,
-                    'consecutive_processed': df_year_merged
-                }
+                st.session_state['results'] = results
                 
                 st.success("✅ Data processed successfully!")
                 st.balloons()
@@ -373,6 +522,18 @@ if st.button("🚀 Analyze Data", type="primary", use_container_width=True):
 if 'results' in st.session_state:
     results = st.session_state['results']
     
+    # Over limit views over the processed frames
+    monthly_over = over_limit_view(
+        results['monthly_processed'],
+        results['monthly_over_idx'],
+        results['monthly_display_cols']
+    )
+    consecutive_over = over_limit_view(
+        results['consecutive_processed'],
+        results['consecutive_over_idx'],
+        results['consecutive_display_cols']
+    )
+    
     st.markdown("---")
     st.header("📈 Rate of Maxhour Report")
     
@@ -402,8 +563,8 @@ if 'results' in st.session_state:
     # Export button
     excel_file = export_to_excel(
         results['summary_report'],
-        results['monthly_over'],
-        results['consecutive_over'],
+        monthly_over,
+        consecutive_over,
         results['monthly_summary'],
         results['consecutive_summary']
     )
@@ -427,35 +588,19 @@ if 'results' in st.session_state:
     with col1:
         st.subheader("Monthly Analysis")
         if not results['monthly_summary'].empty:
-            fig1 = px.bar(
+            fig1 = go.Figure(json.loads(build_bar_chart(
                 results['monthly_summary'],
-                x='Company',
-                y='Percentage',
-                title='Monthly Maxhour Rate by Company (>110 hours)',
-                labels={'Percentage': 'Percentage (%)'},
-                color='Percentage',
-                color_continuous_scale='Reds',
-                text='Percentage'
-            )
-            fig1.update_traces(texttemplate='%{text:.2f}%', textposition='outside')
-            fig1.update_layout(showlegend=False, yaxis_title="Percentage (%)")
+                'Monthly Maxhour Rate by Company (>110 hours)'
+            )))
             st.plotly_chart(fig1, use_container_width=True)
     
     with col2:
         st.subheader("12 Consecutive Months Analysis")
         if not results['consecutive_summary'].empty:
-            fig2 = px.bar(
+            fig2 = go.Figure(json.loads(build_bar_chart(
                 results['consecutive_summary'],
-                x='Company',
-                y='Percentage',
-                title='Consecutive Maxhour Rate by Company (>1050 hours)',
-                labels={'Percentage': 'Percentage (%)'},
-                color='Percentage',
-                color_continuous_scale='Reds',
-                text='Percentage'
-            )
-            fig2.update_traces(texttemplate='%{text:.2f}%', textposition='outside')
-            fig2.update_layout(showlegend=False, yaxis_title="Percentage (%)")
+                'Consecutive Maxhour Rate by Company (>1050 hours)'
+            )))
             st.plotly_chart(fig2, use_container_width=True)
     
     st.markdown("---")
@@ -467,81 +612,29 @@ if 'results' in st.session_state:
     
     with col1:
         st.subheader("🔴 Monthly Over Limit (> 110 hours)")
-        st.metric("Total Crew Over Limit", len(results['monthly_over']))
+        st.metric("Total Crew Over Limit", len(monthly_over))
         
-        if not results['monthly_over'].empty:
-            # Select columns to display
-            display_cols = []
-            for possible_col in ['Name', 'name', 'Crew Name', 'crew name']:
-                col = find_column(results['monthly_over'], [possible_col])
-                if col:
-                    display_cols.append(col)
-                    break
-            
-            for possible_col in ['Company', 'company', 'COMPANY']:
-                col = find_column(results['monthly_over'], [possible_col])
-                if col and col not in display_cols:
-                    display_cols.append(col)
-                    break
-            
-            for possible_col in ['Rank', 'rank', 'RANK']:
-                col = find_column(results['monthly_over'], [possible_col])
-                if col and col not in display_cols:
-                    display_cols.append(col)
-                    break
-            
-            if 'Flight Hours Decimal' in results['monthly_over'].columns:
-                display_cols.append('Flight Hours Decimal')
-            
-            if 'Crew Status' in results['monthly_over'].columns:
-                display_cols.append('Crew Status')
-            
+        if not monthly_over.empty:
             st.dataframe(
-                results['monthly_over'][display_cols].head(20),
+                monthly_over.head(20),
                 use_container_width=True,
                 hide_index=True
             )
-            if len(results['monthly_over']) > 20:
-                st.caption(f"Showing 20 of {len(results['monthly_over'])} crew")
+            if len(monthly_over) > 20:
+                st.caption(f"Showing 20 of {len(monthly_over)} crew")
     
     with col2:
         st.subheader("🔴 Consecutive Over Limit (> 1050 hours)")
-        st.metric("Total Crew Over Limit", len(results['consecutive_over']))
+        st.metric("Total Crew Over Limit", len(consecutive_over))
         
-        if not results['consecutive_over'].empty:
-            # Select columns to display
-            display_cols = []
-            for possible_col in ['Crew Name', 'crew name', 'Name', 'name']:
-                col = find_column(results['consecutive_over'], [possible_col])
-                if col:
-                    display_cols.append(col)
-                    break
-            
-            for possible_col in ['Company', 'company', 'COMPANY']:
-                col = find_column(results['consecutive_over'], [possible_col])
-                if col and col not in display_cols:
-                    display_cols.append(col)
-                    break
-            
-            for possible_col in ['Rank', 'rank', 'RANK']:
-                col = find_column(results['consecutive_over'], [possible_col])
-                if col and col not in display_cols:
-                    display_cols.append(col)
-                    break
-            
-            if 'Flight Hours Decimal' in results['consecutive_over'].columns:
-                display_cols.append('Flight Hours Decimal')
-            
-            if 'Crew Status' in results['consecutive_over'].columns:
-                display_cols.append('Crew Status')
-            
+        if not consecutive_over.empty:
             st.dataframe(
-                results['consecutive_over'][display_cols].head(20),
+                consecutive_over.head(20),
                 use_container_width=True,
                 hide_index=True
             )
-            if len(results['consecutive_over']) > 20:
-                st.caption(f"Showing 20 of {len(results['consecutive_over'])} crew")
+            if len(consecutive_over) > 20:
+                st.caption(f"Showing 20 of {len(consecutive_over)} crew")
 
 # Footer
 st.markdown("---")
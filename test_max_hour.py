@@ -0,0 +1,35 @@
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("streamlit")
+
+from max_hour import actual_rank, decimal_flight_hours
+
+
+def test_decimal_flight_hours_text_values():
+    hours = pd.Series(['110:30', '1,234.5', ' 5 ', '10:30:00', 'abc', '12:', None], dtype=object)
+    assert decimal_flight_hours(hours).tolist() == [110.5, 1234.5, 5.0, 10.5, 0.0, 0.0, 0.0]
+
+
+def test_decimal_flight_hours_mixed_values():
+    hours = pd.Series(['110:30', 110, 12.5, timedelta(hours=115, minutes=30), None], dtype=object)
+    assert decimal_flight_hours(hours).tolist() == [110.5, 110.0, 12.5, 115.5, 0.0]
+
+
+def test_decimal_flight_hours_numeric_column():
+    result = decimal_flight_hours(pd.Series([110, 12.5, np.nan]))
+    assert result.iloc[:2].tolist() == [110.0, 12.5]
+    assert np.isnan(result.iloc[2])
+
+
+def test_decimal_flight_hours_duration_column():
+    hours = pd.Series(pd.to_timedelta(['115:30:00', '20:00:00']))
+    assert decimal_flight_hours(hours).tolist() == [115.5, 20.0]
+
+
+def test_actual_rank():
+    rank = pd.Series([' cpt', 'FO', 'cpt/fo', 'FA', None, np.nan, 3], dtype=object)
+    assert list(actual_rank(rank)) == ['COCKPIT', 'COCKPIT', 'COCKPIT', 'CABIN', 'CABIN', 'CABIN', 'CABIN']